@@ -1,6 +1,8 @@
 import os
 import json
 import re
+import hashlib
+import copy
 
 def loadJsonFile(filepath: str) -> dict:
     try:
@@ -16,91 +18,224 @@ def loadJsonFile(filepath: str) -> dict:
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
         return None
-    
-scriptDir = os.path.dirname(__file__)
-galaxyJsonName = "Galaxy Data.json"
-galaxyJsonPath = os.path.join(scriptDir, galaxyJsonName)
 
-galaxyJson = loadJsonFile(galaxyJsonPath)
-
-parsedClusters = {}
-
-gatesRef = {}
+def saveJsonFile(filepath: str, data: dict):
+    try:
+        #The data files use CRLF line endings, so keep them that way and only changed lines show up in diffs
+        with open(filepath, 'w', encoding='utf-8', newline='\r\n') as f:
+            json.dump(data, f, indent=4)
+    except Exception as e:
+        print(f"Error saving '{filepath}': {e}")
 
-#Create base structure and fill in cluster destinations for gates
-for cluster in galaxyJson["data"]:
+def getClusterID(cluster: dict) -> str:
     clusterIDPattern = r"cluster_(\d+)_connection"
     clusterID = re.match(clusterIDPattern, cluster["name"].lower())
-    
-    clusterID = clusterID.group(1).zfill(3)
-    
+
+    return clusterID.group(1).zfill(3)
+
+def hashCluster(cluster: dict) -> str:
+    #Key order in the dump is not stable between downloads, so hash a canonical form
+    return hashlib.sha256(json.dumps(cluster, sort_keys=True).encode('utf-8')).hexdigest()
+
+def parseCluster(cluster: dict, clusterID: str) -> dict:
     clusterObject = {
         "id": clusterID,
         "name": cluster["qsnaAttributes"]["name"],
         "dlc": cluster["qsnaAttributes"].get("dlc", "base"),
         "sectors": {},
     }
-    
+
     for sector in cluster["sectors"]:
         sectorIDPattern = r"cluster_\d+_sector(\d+)_macro"
         sectorID = re.match(sectorIDPattern, sector["name"].lower())
-        
+
         sectorID = sectorID.group(1).zfill(3)
-        
+
         sectorObject = {
             "id": sectorID,
             "name": sector["qsnaAttributes"]["name"],
             "gates": [],
             "superhighways": []
         }
-        
+
         for zone in sector["zones"]:
             for item in zone["items"]:
                 if item.get("ref", None) == "gates":
                     gateName = item["name"]
-                    
+
                     if gateName == "connection_ClusterGate031To601b":
                         sectorObject["gates"].append({"destCluster": "601", "destSector": None})
-                        gatesRef[(clusterID, "601")] = sectorID
                     else:
                         gatePattern = r"connection_clustergate(\d{3})to(\d{3})"
                         match = re.fullmatch(gatePattern, gateName.lower())
-                        
+
                         if not match: continue
-                        
+
                         sourceCluster = match.group(1)
                         destCluster = match.group(2)
-                        
+
                         if 0 < int(sourceCluster) < 800 and 0 < int(destCluster) < 800:
                             sectorObject["gates"].append({"destCluster": destCluster, "destSector": None})
-                            gatesRef[(clusterID, destCluster)] = sectorID
-        
+
         clusterObject["sectors"][sectorID] = sectorObject
-    
-    parsedClusters[clusterID] = clusterObject
 
-for clusterID, cluster in parsedClusters.items():
+    return clusterObject
+
+def addSuperhighway(cluster: dict, sourceID: str, destID: str):
+    superhighways = cluster["sectors"][sourceID]["superhighways"]
+    if destID not in superhighways:
+        superhighways.append(destID)
+
+def fillSuperhighways(cluster: dict, previousCluster: dict):
     sectorIDs = list(cluster["sectors"].keys())
+    previousSectors = previousCluster["sectors"] if previousCluster else {}
+
+    #Superhighways are not in the galaxy dump, so keep the ones from the last parse (including manual edits) for sectors that still exist
+    for sectorID, sector in cluster["sectors"].items():
+        if sectorID not in previousSectors: continue
+
+        sector["superhighways"] = [superhighway for superhighway in previousSectors[sectorID]["superhighways"] if superhighway in cluster["sectors"]]
+
+    if set(sectorIDs) == set(previousSectors.keys()):
+        return
+
+    if any(sector["superhighways"] for sector in cluster["sectors"].values()):
+        print(f"Sectors changed in: {cluster['name']}, please check the superhighways kept from the previous parse.")
+
     if cluster["name"] == "Savage Spur":
-        cluster["sectors"]["001"]["superhighways"].append("002")
+        addSuperhighway(cluster, "001", "002")
     elif len(sectorIDs) == 2:
         sector1ID = sectorIDs[0]
         sector2ID = sectorIDs[1]
-        
-        cluster["sectors"][sector1ID]["superhighways"].append(sector2ID)
-        cluster["sectors"][sector2ID]["superhighways"].append(sector1ID)
+
+        addSuperhighway(cluster, sector1ID, sector2ID)
+        addSuperhighway(cluster, sector2ID, sector1ID)
     elif len(sectorIDs) == 3:
-        print(f"Three sectors in: {cluster["name"]}, please fill in superhighways manually.")
+        print(f"Three sectors in: {cluster['name']}, please fill in superhighways manually.")
 
-for clusterID, cluster in parsedClusters.items():
-    for sectorID, sector in cluster["sectors"].items():
-        for gate in sector["gates"]:
-            
-            gate["destSector"] = gatesRef.get((gate["destCluster"], clusterID), None)
+def linkGates(parsedClusters: dict):
+    gatesRef = {}
+
+    for clusterID, cluster in parsedClusters.items():
+        for sectorID, sector in cluster["sectors"].items():
+            for gate in sector["gates"]:
+                gatesRef[(clusterID, gate["destCluster"])] = sectorID
+
+    for clusterID, cluster in parsedClusters.items():
+        for sectorID, sector in cluster["sectors"].items():
+            for gate in sector["gates"]:
+                gate["destSector"] = gatesRef.get((gate["destCluster"], clusterID), None)
+
+def getSectorSet(parsedClusters: dict) -> set:
+    return {(clusterID, sectorID) for clusterID, cluster in parsedClusters.items() for sectorID in cluster["sectors"]}
+
+def getGateSet(parsedClusters: dict) -> set:
+    gates = set()
+    for clusterID, cluster in parsedClusters.items():
+        for sectorID, sector in cluster["sectors"].items():
+            for gate in sector["gates"]:
+                gates.add((clusterID, sectorID, gate["destCluster"], gate["destSector"]))
+
+    return gates
+
+def getClusterDLC(clusterID: str, *clusterSets: dict) -> str:
+    for clusters in clusterSets:
+        if clusterID in clusters:
+            return clusters[clusterID]["dlc"]
+
+    return "base"
+
+def diffParsedClusters(oldClusters: dict, newClusters: dict) -> dict:
+    oldSectors = getSectorSet(oldClusters)
+    newSectors = getSectorSet(newClusters)
+    oldGates = getGateSet(oldClusters)
+    newGates = getGateSet(newClusters)
+
+    def sectorEntry(sectorTuple: tuple) -> dict:
+        return {
+            "cluster": sectorTuple[0],
+            "sector": sectorTuple[1],
+            "dlc": getClusterDLC(sectorTuple[0], newClusters, oldClusters),
+        }
+
+    def gateEntry(gateTuple: tuple) -> dict:
+        return {
+            "cluster": gateTuple[0],
+            "sector": gateTuple[1],
+            "destCluster": gateTuple[2],
+            "destSector": gateTuple[3],
+            "dlc": sorted({getClusterDLC(gateTuple[0], newClusters, oldClusters), getClusterDLC(gateTuple[2], newClusters, oldClusters)}),
+        }
+
+    diff = {
+        "addedSectors": [sectorEntry(sectorTuple) for sectorTuple in sorted(newSectors - oldSectors)],
+        "removedSectors": [sectorEntry(sectorTuple) for sectorTuple in sorted(oldSectors - newSectors)],
+        "addedGates": [gateEntry(gateTuple) for gateTuple in sorted(newGates - oldGates, key=str)],
+        "removedGates": [gateEntry(gateTuple) for gateTuple in sorted(oldGates - newGates, key=str)],
+    }
+
+    return diff
+
+def parseGalaxy(galaxyJsonPath: str, outputPath: str, manifestPath: str, diffPath: str) -> dict:
+    galaxyJson = loadJsonFile(galaxyJsonPath)
+
+    if not galaxyJson:
+        print("Error: Galaxy data is missing. Exiting.")
+        return None
+
+    previousClusters = loadJsonFile(outputPath) if os.path.exists(outputPath) else None
+    manifest = loadJsonFile(manifestPath) if os.path.exists(manifestPath) else None
+
+    rawClusters = {getClusterID(cluster): cluster for cluster in galaxyJson["data"]}
+    newManifest = {clusterID: hashCluster(cluster) for clusterID, cluster in rawClusters.items()}
+
+    if previousClusters and manifest is None:
+        #The existing parse has manual superhighway edits, so take it as matching this dump instead of overwriting it
+        print("No cluster hash manifest found, recording hashes for the current galaxy data.")
+        saveJsonFile(manifestPath, newManifest)
+        return None
+
+    previousClusters = previousClusters or {}
+    manifest = manifest or {}
+
+    changedClusters = [clusterID for clusterID, clusterHash in newManifest.items() if manifest.get(clusterID) != clusterHash or clusterID not in previousClusters]
+    removedClusters = [clusterID for clusterID in previousClusters if clusterID not in rawClusters]
+
+    parsedClusters = {}
+
+    for clusterID in rawClusters:
+        if clusterID in changedClusters:
+            parsedClusters[clusterID] = parseCluster(rawClusters[clusterID], clusterID)
+            fillSuperhighways(parsedClusters[clusterID], previousClusters.get(clusterID, None))
+        else:
+            parsedClusters[clusterID] = copy.deepcopy(previousClusters[clusterID])
+
+    #Gate destinations depend on the gate on the other side, so they are relinked for every cluster
+    linkGates(parsedClusters)
+
+    diff = diffParsedClusters(previousClusters, parsedClusters)
+    diff["changedClusters"] = changedClusters
+    diff["removedClusters"] = removedClusters
+
+    print(f"Parsed {len(changedClusters)} changed clusters out of {len(parsedClusters)}, removed {len(removedClusters)}.")
+    print(f"Sectors: +{len(diff['addedSectors'])} -{len(diff['removedSectors'])}, Gates: +{len(diff['addedGates'])} -{len(diff['removedGates'])}")
+
+    if parsedClusters != previousClusters:
+        saveJsonFile(outputPath, parsedClusters)
+    if newManifest != manifest:
+        saveJsonFile(manifestPath, newManifest)
+    saveJsonFile(diffPath, diff)
+
+    return diff
 
-print(f"Parsed {len(parsedClusters)} clusters.")
+if __name__ == "__main__":
+    scriptDir = os.path.dirname(__file__)
 
-outputPath = os.path.join(scriptDir, "Parsed Clusters 2.json")
-#json.dump(parsedClusters, open(outputPath, 'w', encoding='utf-8'), indent=4)
+    parseGalaxy(
+        os.path.join(scriptDir, "Galaxy Data.json"),
+        os.path.join(scriptDir, "Parsed Clusters 2.json"),
+        os.path.join(scriptDir, "Cluster Hashes 2.json"),
+        os.path.join(scriptDir, "Parsed Clusters 2 Diff.json"),
+    )
 
-print("Done")
\ No newline at end of file
+    print("Done")
@@ -1,6 +1,12 @@
 import json
 import os
 import collections
+import csv
+import heapq
+import sys
+import threading
+import math
+import time
 import networkx
 import matplotlib
 
@@ -78,20 +84,28 @@ def distanceBetweenSectors(graph: networkx.DiGraph, startNode, endNode) -> float
     except networkx.NetworkXNoPath:
         return -1
 
-def pathLengths(graph: networkx.DiGraph, startNode: tuple) -> dict:
+def sortRows(rows, key, reverse: bool = False, limit: int = None) -> list:
+    if limit is None:
+        return sorted(rows, key=key, reverse=reverse)
+    
+    #Only the first rows are wanted, so a heap selection avoids sorting everything
+    return (heapq.nlargest if reverse else heapq.nsmallest)(limit, rows, key=key)
+
+def iterPathLengths(graph: networkx.DiGraph, startNode: tuple):
     if startNode not in graph:
         raise networkx.NodeNotFound(f"Node {startNode} not in graph.")
     
-    output = networkx.single_source_dijkstra_path_length(graph, startNode, weight='weight')
-    
-    return dict(sorted(output.items(), key=lambda item: (item[1], item[0])))
+    return iter(networkx.single_source_dijkstra_path_length(graph, startNode, weight='weight').items())
 
-def allPathLengths(graph: networkx.DiGraph) -> dict:
-    output = {}
+def pathLengths(graph: networkx.DiGraph, startNode: tuple) -> dict:
+    return dict(sortRows(iterPathLengths(graph, startNode), key=lambda item: (item[1], item[0])))
+
+def iterAllPathLengths(graph: networkx.DiGraph):
     for node in graph.nodes:
-        output[node] = max(pathLengths(graph, node).values())
-        
-    return dict(sorted(output.items(), key=lambda item: item[1]))
+        yield node, max(distance for sectorTuple, distance in iterPathLengths(graph, node))
+
+def allPathLengths(graph: networkx.DiGraph) -> dict:
+    return dict(sortRows(iterAllPathLengths(graph), key=lambda item: item[1]))
 
 def cutoffPathLengths(graph: networkx.DiGraph, startNode: tuple, maxDistance: float) -> dict:
     if startNode not in graph:
@@ -99,12 +113,219 @@ def cutoffPathLengths(graph: networkx.DiGraph, startNode: tuple, maxDistance: fl
     
     return networkx.single_source_dijkstra_path_length(graph, startNode, cutoff=maxDistance, weight='weight')
 
-def findMaxClustersInRange(graph: networkx.DiGraph, maxDistance: float) -> dict:
-    output = {}
+def iterMaxClustersInRange(graph: networkx.DiGraph, maxDistance: float):
     for node in graph.nodes:
-        output[node] = len(cutoffPathLengths(graph, node, maxDistance))
+        yield node, len(cutoffPathLengths(graph, node, maxDistance))
+
+def findMaxClustersInRange(graph: networkx.DiGraph, maxDistance: float) -> dict:
+    return dict(sortRows(iterMaxClustersInRange(graph, maxDistance), key=lambda item: item[1], reverse=True))
+
+def writeTable(file, headers: list, rows):
+    #The table is for reading on screen, so the rows are gathered to size the name column to the ones shown
+    rows = list(rows)
+    nameWidth = max((len(str(row[0])) for row in rows), default=0)
+    
+    file.writelines(f"{str.ljust(str(row[0]), nameWidth)}: {', '.join(str(value) for value in row[1:])}\n" for row in rows)
+
+def writeCsv(file, headers: list, rows):
+    writer = csv.writer(file, lineterminator="\n")
+    writer.writerow(headers)
+    writer.writerows(rows)
+
+def writeJsonl(file, headers: list, rows):
+    file.writelines(json.dumps(dict(zip(headers, row))) + "\n" for row in rows)
+
+def writeColumns(file, headers: list, rows):
+    columns = [list(column) for column in zip(*rows)] or [[] for header in headers]
+    json.dump(dict(zip(headers, columns)), file)
+    file.write("\n")
+
+outputSinks = {
+    "table": writeTable,
+    "csv": writeCsv,
+    "jsonl": writeJsonl,
+    "columns": writeColumns,
+}
+
+def exportRows(rows, headers: list, outputFormat: str, outputPath: str = None):
+    sink = outputSinks[outputFormat]
+    
+    if not outputPath:
+        sink(sys.stdout, headers, rows)
+        sys.stdout.flush()
+        return
+    
+    try:
+        with open(outputPath, 'w', encoding='utf-8', newline='', buffering=1 << 16) as f:
+            sink(f, headers, rows)
+        print(f"Results saved to '{outputPath}'.")
+    except OSError as e:
+        print(f"Error saving results: {e}")
+
+def chooseOutput() -> tuple:
+    while(True):
+        outputFormat = input(f"Please input the output format ({'/'.join(outputSinks)}), or leave blank for table: ").strip().lower() or "table"
+        if outputFormat in outputSinks:
+            break
+        print("Invalid output format. Please try again.")
+    
+    outputPath = input("Please input a file to save to, or leave blank to print: ").strip() or None
+    
+    while(True):
+        try:
+            limit = input("Please input the number of rows to show, or leave blank for all: ").strip()
+            limit = int(limit) if limit else None
+            if limit is not None and limit < 1:
+                raise ValueError("Number of rows must be at least 1")
+            break
+        except ValueError as e:
+            print("Value was not a positive integer, please try again.")
+    
+    return outputFormat, outputPath, limit
+
+def singleSourcePaths(graph: networkx.DiGraph, startNode: tuple) -> tuple:
+    if startNode not in graph:
+        raise networkx.NodeNotFound(f"Node {startNode} not in graph.")
+    
+    #Kept on the graph itself so the cache is thrown away whenever the graph is rebuilt
+    cache = graph.graph.setdefault("pathCache", {})
+    if startNode not in cache:
+        cache[startNode] = networkx.single_source_dijkstra(graph, startNode, weight='weight')
+    
+    return cache[startNode]
+
+def distanceMatrix(graph: networkx.DiGraph, nodes: list) -> list:
+    matrix = []
+    for node in nodes:
+        lengths, paths = singleSourcePaths(graph, node)
+        matrix.append([lengths.get(other, math.inf) for other in nodes])
+        
+    return matrix
+
+def routeCost(matrix: list, route: list) -> float:
+    return sum(matrix[a][b] for a, b in zip(route, route[1:]))
+
+def heldKarpRoute(matrix: list, middle: list, startIndex: int, endIndex: int) -> list:
+    prefix = [startIndex] if startIndex is not None else []
+    suffix = [endIndex] if endIndex is not None else []
+    count = len(middle)
+    
+    if count == 0:
+        return prefix + suffix
+    
+    fullMask = (1 << count) - 1
+    costs = [[math.inf] * count for mask in range(fullMask + 1)]
+    parents = [[None] * count for mask in range(fullMask + 1)]
+    
+    for i, node in enumerate(middle):
+        costs[1 << i][i] = matrix[startIndex][node] if startIndex is not None else 0
+    
+    #Masks only ever grow, so visiting them in numeric order finishes every subset before it is extended
+    for mask in range(1, fullMask + 1):
+        for last in range(count):
+            cost = costs[mask][last]
+            if cost == math.inf: continue
+            
+            for nextStop in range(count):
+                if mask & (1 << nextStop): continue
+                
+                nextMask = mask | (1 << nextStop)
+                nextCost = cost + matrix[middle[last]][middle[nextStop]]
+                if nextCost < costs[nextMask][nextStop]:
+                    costs[nextMask][nextStop] = nextCost
+                    parents[nextMask][nextStop] = last
+    
+    endCosts = [costs[fullMask][last] + (matrix[middle[last]][endIndex] if endIndex is not None else 0) for last in range(count)]
+    last = min(range(count), key=lambda i: endCosts[i])
+    if endCosts[last] == math.inf:
+        raise ValueError("No route visits all of the sectors with the current DLC selection.")
+    
+    order = []
+    mask = fullMask
+    while last is not None:
+        order.append(middle[last])
+        previous = parents[mask][last]
+        mask ^= 1 << last
+        last = previous
+        
+    return prefix + order[::-1] + suffix
+
+def heuristicRoute(matrix: list, middle: list, startIndex: int, endIndex: int, timeBudget: float) -> list:
+    deadline = time.monotonic() + timeBudget
+    prefix = [startIndex] if startIndex is not None else []
+    suffix = [endIndex] if endIndex is not None else []
+    
+    #Nearest neighbour start, then improved with 2-opt and Or-opt moves until nothing helps or time runs out
+    remaining = list(middle)
+    order = [] if startIndex is not None else [remaining.pop(0)]
+    current = startIndex if startIndex is not None else order[0]
+    while remaining:
+        nextStop = min(remaining, key=lambda node: matrix[current][node])
+        remaining.remove(nextStop)
+        order.append(nextStop)
+        current = nextStop
+    
+    bestCost = routeCost(matrix, prefix + order + suffix)
+    improved = True
+    while improved and time.monotonic() < deadline:
+        improved = False
+        
+        for i in range(len(order) - 1):
+            for j in range(i + 1, len(order)):
+                candidate = order[:i] + order[i:j + 1][::-1] + order[j + 1:]
+                candidateCost = routeCost(matrix, prefix + candidate + suffix)
+                if candidateCost < bestCost:
+                    order, bestCost, improved = candidate, candidateCost, True
+                    
+            if time.monotonic() >= deadline: break
         
-    return dict(sorted(output.items(), key=lambda item: item[1], reverse=True))
+        for segmentLength in (1, 2, 3):
+            for i in range(len(order) - segmentLength + 1):
+                segment = order[i:i + segmentLength]
+                rest = order[:i] + order[i + segmentLength:]
+                
+                for j in range(len(rest) + 1):
+                    if j == i: continue
+                    
+                    candidate = rest[:j] + segment + rest[j:]
+                    candidateCost = routeCost(matrix, prefix + candidate + suffix)
+                    if candidateCost < bestCost:
+                        order, bestCost, improved = candidate, candidateCost, True
+                        break
+                    
+            if time.monotonic() >= deadline: break
+    
+    return prefix + order + suffix
+
+def planTour(graph: networkx.DiGraph, stops: list, startNode: tuple = None, endNode: tuple = None, timeBudget: float = 2.0, maxExactStops: int = 12) -> tuple:
+    nodes = []
+    for node in ([startNode] if startNode else []) + list(stops) + ([endNode] if endNode else []):
+        if node not in graph:
+            raise networkx.NodeNotFound(f"Node {node} not in graph.")
+        if node not in nodes:
+            nodes.append(node)
+    
+    startIndex = nodes.index(startNode) if startNode else None
+    endIndex = nodes.index(endNode) if endNode else None
+    middle = [i for i in range(len(nodes)) if i != startIndex and i != endIndex]
+    
+    matrix = distanceMatrix(graph, nodes)
+    
+    if len(middle) <= maxExactStops:
+        route = heldKarpRoute(matrix, middle, startIndex, endIndex)
+    else:
+        route = heuristicRoute(matrix, middle, startIndex, endIndex, timeBudget)
+    
+    distance = routeCost(matrix, route)
+    if distance == math.inf or set(route) != set(range(len(nodes))):
+        raise ValueError("No route visits all of the sectors with the current DLC selection.")
+    
+    path = [nodes[route[0]]]
+    for a, b in zip(route, route[1:]):
+        lengths, paths = singleSourcePaths(graph, nodes[a])
+        path.extend(paths[nodes[b]][1:])
+    
+    return [nodes[i] for i in route], distance, path
 
 def getSectorName(galaxyJson: dict, sectorTuple: tuple) -> str:
     return galaxyJson[sectorTuple[0]]["sectors"][sectorTuple[1]]["name"]
@@ -140,6 +361,75 @@ def changeDLC(dlcJson: dict, savePath: object) -> dict:
         else:
             print("Invalid DLC. Please try again.")
 
+def carryOverPathCache(oldGraph: networkx.DiGraph, newGraph: networkx.DiGraph):
+    oldCache = oldGraph.graph.get("pathCache", {})
+    newCache = newGraph.graph.setdefault("pathCache", {})
+    
+    oldEdges = set(oldGraph.edges(data='weight'))
+    newEdges = set(newGraph.edges(data='weight'))
+    removedEdges = oldEdges - newEdges
+    addedEdges = newEdges - oldEdges
+    removedNodes = set(oldGraph.nodes) - set(newGraph.nodes)
+    
+    #A cached result still holds if none of its paths use a removed edge and no added edge gives a shorter or new route
+    #Queries on the old graph can still be adding to its cache, so work from a copy
+    for startNode, result in list(oldCache.items()):
+        lengths, paths = result
+        
+        if startNode not in newGraph or not removedNodes.isdisjoint(lengths): continue
+        if any(len(paths.get(v, ())) > 1 and paths[v][-2] == u for u, v, weight in removedEdges): continue
+        if any(u in lengths and (v not in lengths or lengths[u] + weight < lengths[v]) for u, v, weight in addedEdges): continue
+        
+        newCache[startNode] = result
+
+def buildSession(galaxyJson: dict, dlcJson: dict, previousSession: dict = None) -> dict:
+    session = {
+        "galaxyJson": galaxyJson,
+        "dlcJson": dlcJson,
+        "graphClusters": createGraphClusters(dlcJson, galaxyJson),
+        "graphSectors": createGraphSectors(dlcJson, galaxyJson),
+    }
+    
+    if previousSession:
+        carryOverPathCache(previousSession["graphClusters"], session["graphClusters"])
+        carryOverPathCache(previousSession["graphSectors"], session["graphSectors"])
+    
+    return session
+
+def fileSignature(filepath: str) -> tuple:
+    try:
+        stat = os.stat(filepath)
+        return (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+def watchDataFiles(current: dict, galaxyPath: str, dlcPath: str, stopEvent: threading.Event, interval: float = 1.0):
+    while not stopEvent.wait(interval):
+        #Queries already running keep the graphs they started with, the next one picks up the new session
+        with current["lock"]:
+            signatures = {path: fileSignature(path) for path in (galaxyPath, dlcPath)}
+            if signatures == current["signatures"]: continue
+            
+            current["signatures"] = signatures
+            
+            galaxyJson = loadJsonFile(galaxyPath)
+            dlcJson = loadJsonFile(dlcPath)
+            
+            if not galaxyJson or not dlcJson:
+                print("\nData files could not be reloaded, keeping the previous galaxy network.")
+                continue
+            
+            try:
+                session = buildSession(galaxyJson, dlcJson, current["session"])
+            except Exception as e:
+                print(f"\nError rebuilding the galaxy network: {e}, keeping the previous galaxy network.")
+                continue
+            
+            current["session"] = session
+        
+        carried = len(session["graphClusters"].graph["pathCache"]) + len(session["graphSectors"].graph["pathCache"])
+        print(f"\nData files changed, galaxy network reloaded ({carried} cached results kept).")
+
 def main():
     print("Loading files...")
     scriptDir = os.path.dirname(__file__)
@@ -159,12 +449,24 @@ def main():
     countSuperhighways = False
     
     print("Creating galaxy network...")
-    graphClusters = createGraphClusters(dlcJson, galaxyJson)
-    graphSectors = createGraphSectors(dlcJson, galaxyJson)
+    current = {
+        "session": buildSession(galaxyJson, dlcJson),
+        "signatures": {path: fileSignature(path) for path in (galaxyPath, dlcPath)},
+        "lock": threading.Lock(),
+    }
     
     print("Galaxy network created.")
     
+    watchThread = None
+    stopWatching = threading.Event()
+    
     while True:
+        session = current["session"]
+        galaxyJson = session["galaxyJson"]
+        dlcJson = session["dlcJson"]
+        graphClusters = session["graphClusters"]
+        graphSectors = session["graphSectors"]
+        
         print("\nMenu:")
         print("1. Change DLC settings")
         print("2. Calculate distance between two sectors")
@@ -172,13 +474,21 @@ def main():
         print("4. Show the distance to the furthest sector using each sector as a starting point")
         print("5. Calculate the number of sectors within a certain range of a starting sector")
         print("6. Show the number of sectors within a certain range of a starting sector")
+        print("7. Plan the shortest route visiting a list of sectors")
+        print(f"8. {'Stop' if watchThread else 'Start'} watching data files for changes")
         print("exit. Exit the program")
         
         match input("Select an option or 'exit': ").strip().lower():
             case "1":
-                dlcJson = changeDLC(dlcJson, dlcPath)
-                graphClusters = createGraphClusters(dlcJson, galaxyJson)
-                graphSectors = createGraphSectors(dlcJson, galaxyJson)
+                #Start from the latest settings in case the watcher picked up an outside edit, and leave the live session's dict alone
+                dlcJson = changeDLC(dict(current["session"]["dlcJson"]), dlcPath)
+                
+                with current["lock"]:
+                    #Recorded before rebuilding so the watcher does not reload the file that was just saved
+                    current["signatures"][dlcPath] = fileSignature(dlcPath)
+                    
+                    #The watcher may have reloaded the galaxy while the DLC prompt was open, so build from the latest one
+                    current["session"] = buildSession(current["session"]["galaxyJson"], dlcJson, current["session"])
             
             case "2":
                 print()
@@ -221,24 +531,26 @@ def main():
                     except ValueError as e:
                         print(e)
                 
-                dist = pathLengths(graphSectors if countSuperhighways else graphClusters, startSector)
+                outputFormat, outputPath, limit = chooseOutput()
+                
+                dist = sortRows(iterPathLengths(graphSectors if countSuperhighways else graphClusters, startSector), key=lambda item: (item[1], item[0]), limit=limit)
                 
-                length  = max([len(getSectorName(galaxyJson, sectorTuple)) for sectorTuple, distance in dist.items()])
-                print("Distance to each sector:")
+                if outputFormat == "table" and not outputPath:
+                    print("Distance to each sector:")
                 
-                for sectorTuple, distance in dist.items():
-                    print(f"{str.ljust(getSectorName(galaxyJson, sectorTuple), length)}: {distance}")
+                exportRows(((getSectorName(galaxyJson, sectorTuple), distance) for sectorTuple, distance in dist), ["sector", "distance"], outputFormat, outputPath)
                     
             case "4":
                 print()
                 
-                dist = allPathLengths(graphSectors if countSuperhighways else graphClusters)
+                outputFormat, outputPath, limit = chooseOutput()
                 
-                length  = max([len(getSectorName(galaxyJson, sectorTuple)) for sectorTuple, distance in dist.items()])
-                print("Distance to furthest sector from each sector:")
+                dist = sortRows(iterAllPathLengths(graphSectors if countSuperhighways else graphClusters), key=lambda item: item[1], limit=limit)
                 
-                for sectorTuple, distance in dist.items():
-                    print(f"{str.ljust(getSectorName(galaxyJson, sectorTuple), length)}: {distance}")
+                if outputFormat == "table" and not outputPath:
+                    print("Distance to furthest sector from each sector:")
+                
+                exportRows(((getSectorName(galaxyJson, sectorTuple), distance) for sectorTuple, distance in dist), ["sector", "distance"], outputFormat, outputPath)
                     
             case "5":
                 print()
@@ -283,15 +595,99 @@ def main():
                     except ValueError as e:
                         print("Value was not a number, please try again.")
                 
-                sectors = findMaxClustersInRange(graphSectors if countSuperhighways else graphClusters, maxDistance)
+                outputFormat, outputPath, limit = chooseOutput()
+                
+                sectors = sortRows(iterMaxClustersInRange(graphSectors if countSuperhighways else graphClusters, maxDistance), key=lambda item: item[1], reverse=True, limit=limit)
+                
+                if outputFormat == "table" and not outputPath:
+                    print(f"Number of sectors within a range of {maxDistance} from the starting sector:")
                 
-                length  = max([len(getSectorName(galaxyJson, sectorTuple)) for sectorTuple, distance in sectors.items()])
-                print(f"Number of sectors within a range of {maxDistance} from the starting sector:")
+                exportRows(((getSectorName(galaxyJson, sectorTuple), number) for sectorTuple, number in sectors), ["sector", "sectorsInRange"], outputFormat, outputPath)
+            
+            case "7":
+                print()
+                
+                stops = []
+                startSector = None
+                endSector = None
+                
+                tourGraph = graphSectors if countSuperhighways else graphClusters
+                
+                while(True):
+                    excludedDLC = [dlcName.strip().lower() for dlcName in input("Input DLCs to avoid on this route separated by commas, or leave blank: ").split(",") if dlcName.strip()]
+                    if all(dlcName in dlcJson for dlcName in excludedDLC):
+                        break
+                    print("Invalid DLC. Please try again.")
+                
+                if excludedDLC:
+                    tourDLC = {key: value and key not in excludedDLC for key, value in dlcJson.items()}
+                    tourGraph = createGraphSectors(tourDLC, galaxyJson) if countSuperhighways else createGraphClusters(tourDLC, galaxyJson)
+                
+                print("Input the names of the sectors to visit, leave blank when done.")
+                while(True):
+                    sectorName = input(f"Sector {len(stops) + 1}: ").strip()
+                    if not sectorName:
+                        if not stops:
+                            print("Please input at least one sector.")
+                            continue
+                        break
+                    try:
+                        sectorTuple = getSectorTuple(galaxyJson, sectorName)
+                        if sectorTuple not in tourGraph.nodes:
+                            raise ValueError("Sector not allowed by DLC selection")
+                        stops.append(sectorTuple)
+                    except ValueError as e:
+                        print(e)
                 
-                for sectorTuple, number in sectors.items():
-                    print(f"{str.ljust(getSectorName(galaxyJson, sectorTuple), length)}: {number}")
+                while(True):
+                    try:
+                        sectorName = input("Please input the name of the starting sector, or leave blank for any: ").strip()
+                        if sectorName:
+                            startSector = getSectorTuple(galaxyJson, sectorName)
+                            if startSector not in tourGraph.nodes:
+                                raise ValueError("Sector not allowed by DLC selection")
+                        break
+                    except ValueError as e:
+                        print(e)
+                
+                while(True):
+                    try:
+                        sectorName = input("Please input the name of the ending sector (the starting sector for a round trip), or leave blank for any: ").strip()
+                        if sectorName:
+                            endSector = getSectorTuple(galaxyJson, sectorName)
+                            if endSector not in tourGraph.nodes:
+                                raise ValueError("Sector not allowed by DLC selection")
+                        break
+                    except ValueError as e:
+                        print(e)
+                
+                try:
+                    order, distance, path = planTour(tourGraph, stops, startSector, endSector)
+                except ValueError as e:
+                    print(e)
+                    continue
+                
+                print(f"\nShortest route found, total distance {distance}:")
+                for i, sectorTuple in enumerate(order):
+                    print(f"{str(i + 1).rjust(3)}. {getSectorName(galaxyJson, sectorTuple)}")
+                
+                print("\nFull path:")
+                print(" -> ".join(getSectorName(galaxyJson, sectorTuple) for sectorTuple in path))
+            
+            case "8":
+                if watchThread:
+                    stopWatching.set()
+                    watchThread.join()
+                    watchThread = None
+                    print("Stopped watching data files.")
+                else:
+                    stopWatching.clear()
+                    watchThread = threading.Thread(target=watchDataFiles, args=(current, galaxyPath, dlcPath, stopWatching), daemon=True)
+                    watchThread.start()
+                    print("Watching data files for changes.")
             
             case "exit":
+                stopWatching.set()
                 print("Exiting program.")
                 break
             case _:
@@ -299,4 +695,4 @@ def main():
     
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
\ No newline at end of file
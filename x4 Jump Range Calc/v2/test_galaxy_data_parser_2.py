@@ -0,0 +1,105 @@
+import os
+import json
+import importlib.util
+import pytest
+
+scriptDir = os.path.dirname(__file__)
+
+spec = importlib.util.spec_from_file_location("galaxyDataParser2", os.path.join(scriptDir, "Galaxy Data Parser 2.py"))
+galaxyDataParser2 = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(galaxyDataParser2)
+
+def makeSector(clusterNumber: int, sectorNumber: int, gates: list) -> dict:
+    return {
+        "name": f"Cluster_{clusterNumber:02}_Sector{sectorNumber:03}_macro",
+        "qsnaAttributes": {"name": f"Sector {clusterNumber}-{sectorNumber}"},
+        "zones": [{"items": [{"ref": "gates", "name": f"connection_ClusterGate{clusterNumber:03}To{dest:03}"} for dest in gates]}],
+    }
+
+def makeCluster(clusterNumber: int, sectors: dict) -> dict:
+    return {
+        "name": f"Cluster_{clusterNumber:02}_connection",
+        "qsnaAttributes": {"name": f"Cluster {clusterNumber}", "dlc": "base"},
+        "sectors": [makeSector(clusterNumber, sectorNumber, gates) for sectorNumber, gates in sectors.items()],
+    }
+
+@pytest.fixture
+def galaxy(tmp_path):
+    paths = {name: str(tmp_path / f"{name}.json") for name in ("galaxy", "parsed", "manifest", "diff")}
+    clusters = {
+        1: makeCluster(1, {1: [2]}),
+        2: makeCluster(2, {1: [1, 3]}),
+        3: makeCluster(3, {1: [2]}),
+    }
+    
+    def parse(clusters: dict) -> dict:
+        with open(paths["galaxy"], 'w', encoding='utf-8') as f:
+            json.dump({"data": list(clusters.values())}, f)
+        
+        return galaxyDataParser2.parseGalaxy(paths["galaxy"], paths["parsed"], paths["manifest"], paths["diff"])
+    
+    parse(clusters)
+    
+    return clusters, parse, paths
+
+def test_unchangedDumpIsNoOp(galaxy):
+    clusters, parse, paths = galaxy
+    before = {name: open(paths[name], 'rb').read() for name in ("parsed", "manifest")}
+    
+    diff = parse(clusters)
+    
+    assert diff["changedClusters"] == [] and diff["removedClusters"] == []
+    assert not diff["addedSectors"] and not diff["removedSectors"] and not diff["addedGates"] and not diff["removedGates"]
+    assert before == {name: open(paths[name], 'rb').read() for name in ("parsed", "manifest")}
+
+def test_changedGate(galaxy):
+    clusters, parse, paths = galaxy
+    clusters[1] = makeCluster(1, {1: [2, 3]})
+    clusters[3] = makeCluster(3, {1: [2, 1]})
+    
+    diff = parse(clusters)
+    
+    assert sorted(diff["changedClusters"]) == ["001", "003"]
+    assert {(gate["cluster"], gate["sector"], gate["destCluster"], gate["destSector"]) for gate in diff["addedGates"]} == {("001", "001", "003", "001"), ("003", "001", "001", "001")}
+    assert diff["removedGates"] == []
+    
+    clusters[1] = makeCluster(1, {1: [2]})
+    clusters[3] = makeCluster(3, {1: [2]})
+    
+    diff = parse(clusters)
+    
+    assert {(gate["cluster"], gate["destCluster"]) for gate in diff["removedGates"]} == {("001", "003"), ("003", "001")}
+
+def test_clusterGainsAndLosesSector(galaxy):
+    clusters, parse, paths = galaxy
+    clusters[2] = makeCluster(2, {1: [1], 2: [3]})
+    
+    diff = parse(clusters)
+    parsed = galaxyDataParser2.loadJsonFile(paths["parsed"])
+    
+    assert [(sector["cluster"], sector["sector"]) for sector in diff["addedSectors"]] == [("002", "002")]
+    assert parsed["002"]["sectors"]["001"]["superhighways"] == ["002"]
+    assert parsed["002"]["sectors"]["002"]["superhighways"] == ["001"]
+    assert parsed["003"]["sectors"]["001"]["gates"] == [{"destCluster": "002", "destSector": "002"}]
+    
+    clusters[2] = makeCluster(2, {1: [1, 3]})
+    
+    diff = parse(clusters)
+    parsed = galaxyDataParser2.loadJsonFile(paths["parsed"])
+    
+    assert [(sector["cluster"], sector["sector"]) for sector in diff["removedSectors"]] == [("002", "002")]
+    assert parsed["002"]["sectors"]["001"]["superhighways"] == []
+    assert parsed["003"]["sectors"]["001"]["gates"] == [{"destCluster": "002", "destSector": "001"}]
+
+def test_removedCluster(galaxy):
+    clusters, parse, paths = galaxy
+    del clusters[3]
+    clusters[2] = makeCluster(2, {1: [1]})
+    
+    diff = parse(clusters)
+    parsed = galaxyDataParser2.loadJsonFile(paths["parsed"])
+    
+    assert diff["removedClusters"] == ["003"]
+    assert "003" not in parsed
+    assert [(sector["cluster"], sector["sector"]) for sector in diff["removedSectors"]] == [("003", "001")]
+    assert {(gate["cluster"], gate["destCluster"]) for gate in diff["removedGates"]} == {("002", "003"), ("003", "002")}
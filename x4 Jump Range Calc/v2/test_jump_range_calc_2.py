@@ -0,0 +1,146 @@
+import os
+import io
+import csv
+import json
+import importlib.util
+import networkx
+import itertools
+import random
+import pytest
+
+scriptDir = os.path.dirname(__file__)
+
+spec = importlib.util.spec_from_file_location("jumpRangeCalc2", os.path.join(scriptDir, "Jump Range Calc 2.py"))
+jumpRangeCalc2 = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(jumpRangeCalc2)
+
+@pytest.fixture(scope="module")
+def graphClusters():
+    galaxyJson = jumpRangeCalc2.loadJsonFile(os.path.join(scriptDir, "Parsed Clusters 2.json"))
+    dlcJson = jumpRangeCalc2.loadJsonFile(os.path.join(scriptDir, "dlcData.json"))
+    
+    return jumpRangeCalc2.createGraphClusters(dlcJson, galaxyJson)
+
+def test_planTourVisitsEveryStop(graphClusters):
+    stops = [("001", "001"), ("002", "001"), ("004", "002")]
+    order, distance, path = jumpRangeCalc2.planTour(graphClusters, stops, ("003", "001"))
+    
+    assert order[0] == ("003", "001")
+    assert set(order) == set(stops) | {("003", "001")}
+    assert path[0] == order[0] and path[-1] == order[-1]
+
+def test_planTourUnreachableStop(graphClusters):
+    #Unknown System has no gates, so no route can reach it
+    stops = [("001", "001"), ("002", "001"), ("504", "001")]
+    
+    with pytest.raises(ValueError):
+        jumpRangeCalc2.planTour(graphClusters, stops, ("003", "001"))
+    
+    with pytest.raises(ValueError):
+        jumpRangeCalc2.planTour(graphClusters, stops, ("003", "001"), maxExactStops=0)
+
+def bruteForceDistance(graph, stops: list, startNode: tuple, endNode: tuple) -> float:
+    middle = [stop for stop in dict.fromkeys(stops) if stop not in (startNode, endNode)]
+    matrixNodes = list(dict.fromkeys(([startNode] if startNode else []) + middle + ([endNode] if endNode else [])))
+    matrix = jumpRangeCalc2.distanceMatrix(graph, matrixNodes)
+    
+    best = float("inf")
+    for order in itertools.permutations(middle):
+        route = ([startNode] if startNode else []) + list(order) + ([endNode] if endNode else [])
+        best = min(best, jumpRangeCalc2.routeCost(matrix, [matrixNodes.index(node) for node in route]))
+        
+    return best
+
+def test_planTourMatchesBruteForce(graphClusters):
+    random.seed(0)
+    nodes = sorted(node for node in graphClusters.nodes if graphClusters.degree(node) > 0)
+    
+    for i in range(20):
+        stops = random.sample(nodes, 6)
+        startNode = random.choice([None, stops[0]])
+        endNode = random.choice([None, stops[-1]])
+        
+        order, distance, path = jumpRangeCalc2.planTour(graphClusters, stops, startNode, endNode)
+        
+        assert distance == bruteForceDistance(graphClusters, stops, startNode, endNode)
+        assert set(order) == set(stops)
+
+def test_planTourRoundTrip(graphClusters):
+    stops = [("001", "001"), ("002", "001"), ("004", "002"), ("005", "001")]
+    startNode = ("003", "001")
+    
+    for maxExactStops in (12, 0):
+        order, distance, path = jumpRangeCalc2.planTour(graphClusters, stops, startNode, startNode, maxExactStops=maxExactStops)
+        
+        assert order[0] == startNode and order[-1] == startNode
+        assert set(order[1:-1]) == set(stops)
+        assert path[0] == startNode and path[-1] == startNode
+        assert distance == bruteForceDistance(graphClusters, stops, startNode, startNode)
+
+def test_sortRowsLimitMatchesFullSort(graphClusters):
+    rows = list(jumpRangeCalc2.iterMaxClustersInRange(graphClusters, 3))
+    
+    for key, reverse in ((lambda item: item[1], True), (lambda item: item[1], False), (lambda item: (item[1], item[0]), False)):
+        fullSort = jumpRangeCalc2.sortRows(rows, key=key, reverse=reverse)
+        
+        assert fullSort == sorted(rows, key=key, reverse=reverse)
+        for limit in (1, 5, 20, len(rows), len(rows) + 5):
+            assert jumpRangeCalc2.sortRows(iter(rows), key=key, reverse=reverse, limit=limit) == fullSort[:limit]
+
+def writeRows(outputFormat: str, headers: list, rows: list) -> str:
+    file = io.StringIO()
+    jumpRangeCalc2.outputSinks[outputFormat](file, headers, iter(rows))
+    
+    return file.getvalue()
+
+def test_outputSinks():
+    headers = ["sector", "distance"]
+    rows = [("Grand Exchange I", 0), ("Argon Prime", 3), ("Hatikvah's Choice I", 12)]
+    
+    assert [tuple(row) for row in csv.reader(io.StringIO(writeRows("csv", headers, rows)))] == [tuple(headers)] + [(name, str(distance)) for name, distance in rows]
+    assert [json.loads(line) for line in writeRows("jsonl", headers, rows).splitlines()] == [dict(zip(headers, row)) for row in rows]
+    assert json.loads(writeRows("columns", headers, rows)) == {"sector": [row[0] for row in rows], "distance": [row[1] for row in rows]}
+    assert json.loads(writeRows("columns", headers, [])) == {"sector": [], "distance": []}
+    
+    assert writeRows("table", headers, rows).splitlines() == [
+        "Grand Exchange I   : 0",
+        "Argon Prime        : 3",
+        "Hatikvah's Choice I: 12",
+    ]
+
+def carryOver(oldEdges: list, newEdges: list, removedNodes: set = set()) -> set:
+    oldGraph = networkx.DiGraph()
+    oldGraph.add_weighted_edges_from(oldEdges)
+    newGraph = networkx.DiGraph()
+    newGraph.add_nodes_from(node for node in oldGraph.nodes if node not in removedNodes)
+    newGraph.add_weighted_edges_from(newEdges)
+    
+    for node in oldGraph.nodes:
+        jumpRangeCalc2.singleSourcePaths(oldGraph, node)
+    
+    jumpRangeCalc2.carryOverPathCache(oldGraph, newGraph)
+    
+    cache = newGraph.graph["pathCache"]
+    for startNode, (lengths, paths) in cache.items():
+        assert (lengths, paths) == networkx.single_source_dijkstra(newGraph, startNode, weight='weight')
+    
+    return set(cache)
+
+def test_carryOverPathCache():
+    #a -> b -> c -> d is the shortest path tree from a, a -> c is a longer alternative, x and y are a separate component
+    edges = [("a", "b", 1), ("b", "c", 1), ("c", "d", 1), ("a", "c", 5), ("x", "y", 1), ("y", "x", 1)]
+    
+    assert carryOver(edges, edges) == {"a", "b", "c", "d", "x", "y"}
+    
+    #Removing an edge only matters to sources whose paths use it
+    assert carryOver(edges, [edge for edge in edges if edge[:2] != ("a", "c")]) == {"a", "b", "c", "d", "x", "y"}
+    assert carryOver(edges, [edge for edge in edges if edge[:2] != ("b", "c")]) == {"c", "d", "x", "y"}
+    
+    #A shortcut invalidates the sources it shortens, an edge that is no shorter does not
+    assert carryOver(edges, edges + [("a", "d", 1), ("b", "d", 5)]) == {"b", "c", "d", "x", "y"}
+    
+    #An edge to a new sector invalidates every source that can now reach it
+    assert carryOver(edges, edges + [("d", "z", 1)]) == {"x", "y"}
+    
+    #Removing a reachable sector invalidates every source that reached it
+    assert carryOver(edges, [edge for edge in edges if "c" not in edge[:2]], {"c"}) == {"d", "x", "y"}